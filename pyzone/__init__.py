@@ -3,7 +3,12 @@
 """
 pyzone - a simple module for managing Solaris zones
 """
-import subprocess, os, re
+import subprocess, os, re, errno, stat, hashlib, string, tempfile, threading
+from xml.sax.saxutils import quoteattr
+try:
+    import Queue as queue
+except ImportError:
+    import queue
 
 CMD_ZONEADM = "/usr/sbin/zoneadm"
 CMD_ZONECFG = "/usr/sbin/zonecfg"
@@ -13,6 +18,16 @@ CMD_PFEXEC  = "/usr/bin/pfexec"
 ZONE_TMPL_SUFFIX = ".xml"
 ZONE_TMPL_DIR = "/etc/zones"
 
+# post install configuration file relative to the zone root
+SYSIDCFG_PATH = os.path.join("etc", "sysidcfg")
+
+# brands configured by SC profile passed to zoneadm install/clone -c
+# rather than by sysidcfg, their root is not mounted once installed
+SC_PROFILE_BRANDS = ("solaris",)
+
+# number of zones configured in parallel by configure_zones()
+CONFIGURE_WORKERS = 8
+
 # zoneadm.c ZONE_ENTRY like structure
 ZONE_ENTRY = {
     'ZID' :    0,
@@ -33,11 +48,176 @@ ZONE_STATE = {
     'incomplete' : 4, # during installation
 }
 
+SYSIDCFG_DEFAULTS = {
+    "hostname"           : None, # defaults to the zone name
+    "root_password"      : None, # crypt(3) hash, required
+    "system_locale"      : "en_US",
+    "timeserver"         : "localhost",
+    "timezone"           : "US/Eastern",
+    "terminal"           : "vt100",
+    "security_policy"    : "NONE",
+    "nfs4_domain"        : "localdomain",
+    "name_service"       : "NONE",
+    #these values require name_service : DNS {\ndomain_name=val\n...}
+    "domain_name"        : None,
+    "name_server"        : None, # A IPs separated by comma
+    "search"             : None, # Hosts separated by comma
+
+    # need to check if this is necessary when there is no networking
+    "network_interface"  : "PRIMARY",
+    "ip_address"         : "127.0.0.1",
+    "netmask"            : "255.255.255.0",
+    "protocol_ipv6"      : "no",
+    "default_route"      : "127.0.0.1",
+}
+
+# comma separated options, whitespace around the commas is dropped
+SYSIDCFG_LIST_OPTIONS = ("name_server", "search")
+
+# templates are compiled once on import and shared by all zones
+SYSIDCFG_TMPL = string.Template("""\
+system_locale=$system_locale
+timeserver=$timeserver
+timezone=$timezone
+terminal=$terminal
+security_policy=$security_policy
+nfs4_domain=$nfs4_domain
+root_password=$root_password
+name_service=$name_service
+network_interface=$network_interface {$network}
+""")
+
+SC_PROFILE_TMPL = string.Template("""\
+<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE service_bundle SYSTEM "/usr/share/lib/xml/dtd/service_bundle.dtd.1">
+<service_bundle type="profile" name="sysconfig">
+  <service version="1" type="service" name="system/config-user">
+    <instance enabled="true" name="default">
+      <property_group type="application" name="root_account">
+        <propval type="astring" name="login" value="root"/>
+        <propval type="astring" name="password" value=$root_password/>
+      </property_group>
+    </instance>
+  </service>
+  <service version="1" type="service" name="system/identity">
+    <instance enabled="true" name="node">
+      <property_group type="application" name="config">
+        <propval type="astring" name="nodename" value=$hostname/>
+      </property_group>
+    </instance>
+  </service>
+  <service version="1" type="service" name="system/timezone">
+    <instance enabled="true" name="default">
+      <property_group type="application" name="timezone">
+        <propval type="astring" name="localtime" value=$timezone/>
+      </property_group>
+    </instance>
+  </service>
+  <service version="1" type="service" name="system/environment">
+    <instance enabled="true" name="init">
+      <property_group type="application" name="environment">
+        <propval type="astring" name="LANG" value=$system_locale/>
+      </property_group>
+    </instance>
+  </service>
+  <service version="1" type="service" name="system/console-login">
+    <instance enabled="true" name="default">
+      <property_group type="application" name="ttymon">
+        <propval type="astring" name="terminal_type" value=$terminal/>
+      </property_group>
+    </instance>
+  </service>
+  <service version="1" type="service" name="network/nfs/mapid">
+    <instance enabled="true" name="default">
+      <property_group type="application" name="nfs-props">
+        <propval type="astring" name="nfsmapid_domain" value=$nfs4_domain/>
+      </property_group>
+    </instance>
+  </service>
+  <service version="1" type="service" name="network/physical">
+    <instance enabled="true" name="default">
+      <property_group type="application" name="netcfg">
+        <propval type="astring" name="active_ncp" value="DefaultFixed"/>
+      </property_group>
+    </instance>
+  </service>
+$services</service_bundle>
+""")
+
+SC_INSTALL_TMPL = string.Template("""\
+  <service version="1" type="service" name="network/install">
+    <instance enabled="true" name="default">
+$interfaces    </instance>
+  </service>
+""")
+
+SC_IPV4_TMPL = string.Template("""\
+      <property_group type="application" name="install_ipv4_interface">
+        <propval type="astring" name="name" value=$name/>
+        <propval type="astring" name="address_type" value="static"/>
+        <propval type="net_address_v4" name="static_address" value=$address/>
+$default_route      </property_group>
+""")
+
+SC_ROUTE_TMPL = string.Template("""\
+        <propval type="net_address_v4" name="default_route" value=$default_route/>
+""")
+
+SC_IPV6_TMPL = string.Template("""\
+      <property_group type="application" name="install_ipv6_interface">
+        <propval type="astring" name="name" value=$name/>
+        <propval type="astring" name="address_type" value="addrconf"/>
+        <propval type="astring" name="stateless" value="yes"/>
+        <propval type="astring" name="stateful" value="yes"/>
+      </property_group>
+""")
+
+SC_DNS_TMPL = string.Template("""\
+  <service version="1" type="service" name="network/dns/client">
+    <property_group type="application" name="config">
+      <property type="net_address" name="nameserver">
+        <net_address_list>
+$name_server        </net_address_list>
+      </property>
+      <property type="astring" name="search">
+        <astring_list>
+$search        </astring_list>
+      </property>
+      <propval type="astring" name="domain" value=$domain_name/>
+    </property_group>
+    <instance enabled="true" name="default"/>
+  </service>
+  <service version="1" type="service" name="system/name-service/switch">
+    <property_group type="application" name="config">
+      <propval type="astring" name="default" value="files"/>
+      <propval type="astring" name="host" value="files dns"/>
+    </property_group>
+    <instance enabled="true" name="default"/>
+  </service>
+""")
+
+SC_VALUE_TMPL = string.Template("""\
+          <value_node value=$value/>
+""")
+
 # TODO: more Zone*Exceptions and replace Key/ValueErrors
 class ZoneException(Exception):
     """General zone exception"""
     pass
 
+class ZoneConfigureException(ZoneException):
+    """
+    Exception raised by configure_zones() in case that some zones failed
+    @param results - dict {'zonename' : True/False} of configured zones
+    @param errors - dict {'zonename' : exception} of failed zones
+    """
+    def __init__(self, results, errors):
+        ZoneException.__init__(self, "Configuration of zones failed: %s." %
+                ", ".join(["%s (%s)" % (name, errors[name])
+                    for name in sorted(errors)]))
+        self.results = results
+        self.errors = errors
+
 class PrivilegesError(Exception):
     """
     Exception signalizing that user does not have required permissions
@@ -127,6 +307,290 @@ def getoutputs(cmd, check_privileges=True):
                 (str(cmd), ret, stderr, stdout))
     return stdout
 
+def _config_values(config_dict, hostname):
+    """
+    merges config_dict with SYSIDCFG_DEFAULTS
+    @param config_dict - dict overriding SYSIDCFG_DEFAULTS or None
+    @param hostname - used in case that config_dict has no hostname
+    @raise ZoneException in case of unsupported option, missing
+           root_password or hostname, or a value which would break
+           the sysidcfg syntax (whitespace, newlines or braces)
+    """
+    config = dict(SYSIDCFG_DEFAULTS)
+    for key, value in (config_dict or {}).items():
+        if key not in SYSIDCFG_DEFAULTS:
+            raise ZoneException("Unsupported configuration option: %s." % key)
+        config[key] = value
+
+    if not config["root_password"]:
+        raise ZoneException("root_password (a crypt(3) hash) is required.")
+    if not config["hostname"]:
+        config["hostname"] = hostname
+    if not config["hostname"]:
+        raise ZoneException("hostname is required.")
+
+    for key, value in config.items():
+        if value is None:
+            continue
+        # "%s" rather than str() keeps unicode values intact under python 2
+        items = ["%s" % value]
+        if key in SYSIDCFG_LIST_OPTIONS:
+            items = [item.strip() for item in items[0].split(",")]
+            items = [item for item in items if item]
+        for item in items:
+            if re.search(r"[\s{}]", item):
+                raise ZoneException("Invalid value of %s: %r." % (key, value))
+        config[key] = ",".join(items)
+    return config
+
+def render_sysidcfg(config_dict=None, hostname=None):
+    """
+    returns contents of sysidcfg(4) file
+    @param config_dict - dict overriding SYSIDCFG_DEFAULTS
+    @param hostname - hostname used if config_dict does not set one
+    @raise ZoneException in case that config_dict is invalid
+    """
+    config = _config_values(config_dict, hostname)
+
+    network = []
+    for key in ("hostname", "ip_address", "netmask", "protocol_ipv6",
+            "default_route"):
+        if config[key]:
+            network.append("%s=%s" % (key, config[key]))
+    config["network"] = " ".join(network)
+
+    if config["name_service"] == "DNS":
+        dns = []
+        for key in ("domain_name", "name_server", "search"):
+            if config[key]:
+                dns.append("%s=%s" % (key, config[key]))
+        config["name_service"] = "DNS {%s}" % " ".join(dns)
+
+    return SYSIDCFG_TMPL.substitute(config)
+
+def _sc_values(value):
+    """
+    returns value_node lines for a comma separated list
+    @param value - e.g. "10.0.0.1,10.0.0.2" or None
+    """
+    return "".join([SC_VALUE_TMPL.substitute(value=quoteattr(item))
+        for item in (value or "").split(",") if item])
+
+def _prefix_len(netmask):
+    """
+    returns prefix length of a dotted netmask e.g. 24 for 255.255.255.0
+    @param netmask
+    @raise ZoneException in case that netmask is not a dotted netmask
+    """
+    octets = ("%s" % netmask).split(".")
+    # isdigit() accepts digits int() can't parse, e.g. superscripts
+    if len(octets) != 4 or not all([re.match("[0-9]{1,3}$", octet) and
+            int(octet) < 256 for octet in octets]):
+        raise ZoneException("Invalid netmask: %s." % netmask)
+
+    bits = "".join(["{0:08b}".format(int(octet)) for octet in octets])
+    if "01" in bits:
+        raise ZoneException("Netmask %s is not contiguous." % netmask)
+    return bits.count("1")
+
+def render_sc_profile(config_dict=None, hostname=None):
+    """
+    returns contents of the SC profile used by solaris branded zones
+    @param config_dict - dict overriding SYSIDCFG_DEFAULTS
+    @param hostname - hostname used if config_dict does not set one
+    @raise ZoneException in case that config_dict is invalid, e.g. it
+           contains option the SC profile can't express or bad netmask
+
+    Note: network/install is written only if config_dict sets ip_address
+          (IPv4) or protocol_ipv6=yes (IPv6 addrconf), default route only
+          if config_dict sets default_route
+    """
+    config = _config_values(config_dict, hostname)
+    given = config_dict or {}
+
+    if "timeserver" in given:
+        raise ZoneException("timeserver is not supported by SC profile.")
+    if config["security_policy"] != "NONE":
+        raise ZoneException("security_policy %s is not supported by "\
+                "SC profile." % config["security_policy"])
+    if config["name_service"] not in ("NONE", "DNS"):
+        raise ZoneException("name_service %s is not supported by "\
+                "SC profile." % config["name_service"])
+    for key in ("netmask", "default_route"):
+        if key in given and not given.get("ip_address"):
+            raise ZoneException("%s requires ip_address." % key)
+
+    # _config_values() made all values strings, None is left out
+    quote = lambda value: quoteattr(value or "")
+
+    interface = config["network_interface"]
+    if interface == "PRIMARY":
+        interface = "net0"
+
+    interfaces = []
+    if given.get("ip_address"):
+        # the loopback default of sysidcfg is no route for a real interface
+        route = ""
+        if given.get("default_route"):
+            route = SC_ROUTE_TMPL.substitute(
+                    default_route=quote(given["default_route"]))
+        interfaces.append(SC_IPV4_TMPL.substitute(
+            name=quote(interface + "/v4"),
+            address=quote("%s/%d" % (config["ip_address"],
+                _prefix_len(config["netmask"]))),
+            default_route=route))
+    if config["protocol_ipv6"] == "yes":
+        interfaces.append(SC_IPV6_TMPL.substitute(
+            name=quote(interface + "/v6")))
+
+    services = []
+    if interfaces:
+        services.append(SC_INSTALL_TMPL.substitute(
+            interfaces="".join(interfaces)))
+    if config["name_service"] == "DNS":
+        services.append(SC_DNS_TMPL.substitute(
+            name_server=_sc_values(config["name_server"]),
+            search=_sc_values(config["search"]),
+            domain_name=quote(config["domain_name"])))
+
+    # values are quoted here so the template carries no quotes of its own
+    for key, value in config.items():
+        config[key] = quote(value)
+    config["services"] = "".join(services)
+
+    return SC_PROFILE_TMPL.substitute(config)
+
+def _zone_dir(root, path):
+    """
+    returns directory of path under root, missing directories are created
+    zone root is under control of the zone so no symlink is followed
+
+    @param root - zone root e.g. /zones/myzone/root
+    @param path - file path relative to root
+    @raise ZoneException in case that any component is a symlink
+    """
+    current = root
+    for part in os.path.dirname(path).split(os.sep):
+        current = os.path.join(current, part)
+        try:
+            mode = os.lstat(current).st_mode
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                raise
+            os.mkdir(current, 0o755)
+            continue
+
+        if stat.S_ISLNK(mode):
+            raise ZoneException("%s is a symlink." % current)
+        if not stat.S_ISDIR(mode):
+            raise ZoneException("%s is not a directory." % current)
+    return current
+
+def _encode(contents):
+    """
+    returns contents as bytes, unicode is encoded as UTF-8 and
+    byte strings are left as they are
+    @param contents - a string
+    """
+    if isinstance(contents, bytes):
+        return contents
+    return contents.encode("utf-8")
+
+def _write_fd(fd, data):
+    """
+    writes whole data into an opened file descriptor and syncs it
+    @param fd - file descriptor opened for writing
+    @param data - bytes
+    """
+    while data:
+        data = data[os.write(fd, data):]
+    os.fsync(fd)
+
+def _read_fd(fd):
+    """
+    returns whole contents of an opened file descriptor
+    @param fd - file descriptor opened for reading
+    """
+    chunks = []
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+def write_config(root, path, contents, mode=0o600):
+    """
+    atomically writes contents into path under the zone root
+    file is left untouched if its contents are already up to date
+
+    Note: symlinks are refused, but the zone should not be running
+          as nothing prevents it from changing its root meanwhile
+
+    @param root - zone root e.g. /zones/myzone/root
+    @param path - file path relative to root
+    @param contents - a string, unicode is written as UTF-8 and
+                      byte strings as they are
+    @param mode=0600 - permissions of the file (may contain root password)
+    @raise ZoneException in case that path leads through a symlink or
+           the file is not a regular file
+    @raise OSError in case that creating directories, writing or
+           renaming the file fails
+    returns True if file was written, False if it was up to date
+    """
+    data = _encode(contents)
+    digest = hashlib.sha1(data).hexdigest()
+
+    dirname = _zone_dir(root, path)
+    cfg_path = os.path.join(dirname, os.path.basename(path))
+
+    # a FIFO or device would block open(), so only regular files are read
+    try:
+        cfg_mode = os.lstat(cfg_path).st_mode
+    except OSError as err:
+        if err.errno != errno.ENOENT:
+            raise
+    else:
+        if stat.S_ISLNK(cfg_mode):
+            raise ZoneException("%s is a symlink." % cfg_path)
+        if not stat.S_ISREG(cfg_mode):
+            raise ZoneException("%s is not a regular file." % cfg_path)
+
+    # O_NOFOLLOW and O_NONBLOCK guard against the path being swapped since
+    try:
+        fd = os.open(cfg_path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0) |
+                getattr(os, "O_NONBLOCK", 0))
+    except OSError as err:
+        if err.errno == errno.ELOOP:
+            raise ZoneException("%s is a symlink." % cfg_path)
+        if err.errno != errno.ENOENT:
+            raise
+    else:
+        try:
+            cfg_stat = os.fstat(fd)
+            if not stat.S_ISREG(cfg_stat.st_mode):
+                raise ZoneException("%s is not a regular file." % cfg_path)
+            if hashlib.sha1(_read_fd(fd)).hexdigest() == digest:
+                # contents are fine, but the mode must be enforced anyway
+                if stat.S_IMODE(cfg_stat.st_mode) != mode:
+                    os.fchmod(fd, mode)
+                return False
+        finally:
+            os.close(fd)
+
+    # temporary file must reside on the same filesystem for rename()
+    fd, tmp_path = tempfile.mkstemp(prefix=".pyzone", dir=dirname)
+    try:
+        try:
+            os.fchmod(fd, mode)
+            _write_fd(fd, data)
+        finally:
+            os.close(fd)
+        os.rename(tmp_path, cfg_path)
+    except:
+        os.unlink(tmp_path)
+        raise
+    return True
+
 class Zone(object):
     """
     simple zone wrapper
@@ -380,14 +844,19 @@ class Zone(object):
     #--------------------------------------------------------------------------
     # Install / Clone
     #--------------------------------------------------------------------------
-    def install(self, print_cmd=False):
+    def install(self, print_cmd=False, config_dict=None):
         """
         note: RBAC aware (pfexec and roles check)
         @print_cmd=False - don't execute anything only return a list with
                            commands [['pfexec' ,...], ]
+        @config_dict=None - post install configuration, skipped if None
+                            or print_cmd is set. SC profile is passed
+                            to zoneadm install -c for SC_PROFILE_BRANDS,
+                            self.configure() is called otherwise
         """
         check_user_permissions()
 
+        # refreshes all attributes so _sc_profile_brand() can use them
         self._zone_in_states((ZONE_STATE['configured'],))
 
         install_cmd = [CMD_PFEXEC, CMD_ZONEADM, "-z", self.get_name(),
@@ -395,23 +864,86 @@ class Zone(object):
 
         if print_cmd:
             return [install_cmd, ]
-        return getoutputs(install_cmd)
-        # TODO post install configuration
+        return self._install_configured(install_cmd, [], config_dict)
 
-    def clone(self, source_zone, print_cmd=False):
+    def clone(self, source_zone, print_cmd=False, config_dict=None):
         """
         note: RBAC aware (pfexec and roles check)
         @source_zone - a Zone() object in a installed state
         @print_cmd=False - don't execute anything only return a list with
                            commands [['pfexec' ,...], ]
+        @config_dict=None - post install configuration, skipped if None
+                            or print_cmd is set. SC profile is passed
+                            to zoneadm clone -c for SC_PROFILE_BRANDS,
+                            self.configure() is called otherwise
         """
         # raise exception if it's not halted
         source_zone._zone_in_states((ZONE_STATE['installed'],))
 
-        clone_cmd = [CMD_PFEXEC, CMD_ZONEADM, "-z", self.get_name(), "clone", source_zone.get_name()]
+        clone_cmd = [CMD_PFEXEC, CMD_ZONEADM, "-z", self.get_name(), "clone"]
         if print_cmd:
-            return [clone_cmd, ]
-        return getoutputs(clone_cmd)
+            return [clone_cmd + [source_zone.get_name()], ]
+
+        if config_dict is not None:
+            self.refresh_all_info() # brand for _sc_profile_brand()
+        return self._install_configured(clone_cmd, [source_zone.get_name()],
+                config_dict)
+
+    def _install_configured(self, cmd, args, config_dict):
+        """
+        runs zoneadm install or clone followed by post install configuration
+        this should be called only by self.install() and self.clone()
+        @param cmd - zoneadm command up to the options
+        @param args - zoneadm arguments following the options
+        @param config_dict - see self.install()
+        @raise ZoneException in case that config_dict is invalid
+        @raise OSError in case that zoneadm fails or see self.configure()
+        """
+        if config_dict is None:
+            return getoutputs(cmd + args)
+
+        if not self._sc_profile_brand():
+            output = getoutputs(cmd + args)
+            self.configure(config_dict)
+            return output
+
+        # root of the zone is not mounted after install, so zoneadm
+        # applies the profile itself
+        profile_path = self._write_sc_profile(config_dict)
+        try:
+            return getoutputs(cmd + ["-c", profile_path] + args)
+        finally:
+            os.unlink(profile_path)
+
+    def _sc_profile_brand(self):
+        """
+        returns True if zone is configured by SC profile, see
+        SC_PROFILE_BRANDS. Zone attributes must be refreshed already.
+        """
+        return self.get_attr(ZONE_ENTRY['ZBRAND'], False) in SC_PROFILE_BRANDS
+
+    def configure(self, config_dict=None):
+        """
+        post install configuration of the zone, writes sysidcfg into
+        the zone root. SC_PROFILE_BRANDS are configured only by
+        install() or clone() as their root is not mounted once installed
+        @param config_dict - dict overriding SYSIDCFG_DEFAULTS, it must
+                             contain root_password as a crypt(3) hash
+        @raise ZoneException in case that zone is not installed, is one
+               of SC_PROFILE_BRANDS or config_dict is invalid
+        @raise OSError in case that writing into the zone root fails or
+               zoneadm exits with non-zero returncode
+
+        returns True if configuration was written, False if it was
+        already up to date
+        """
+        # refreshes all attributes so get_attr(refresh=False) is enough below
+        self._zone_in_states((ZONE_STATE['installed'],))
+
+        if self._sc_profile_brand():
+            raise ZoneException("Zone '%s' can be configured only by "\
+                    "install() or clone()." % self.get_name())
+        return self._write_sysidcfg(config_dict)
 
     #--------------------------------------------------------------------------
     # Deletion / Creation
@@ -436,8 +968,6 @@ class Zone(object):
 
         return self._create_minimal(template, print_cmd)
 
-        #self._write_sysidcfg()
-
     def _create_minimal(self, template, print_cmd=False):
         """
         minimal form of the creation command
@@ -470,47 +1000,38 @@ class Zone(object):
 
 
 
-    def _write_sysidcfg(self, config_dict):
+    def _write_sysidcfg(self, config_dict=None):
         """
-        post install configuration of the zone
-        this should be called only by self.create()
+        writes sysidcfg into the zone root
+        this should be called only by self.configure()
+        @param config_dict - dict overriding SYSIDCFG_DEFAULTS
 
+        Note: This is probably the only reason why Zone Admin is not enough
         """
-        sysidcfg_path = os.path.join(self.get_zone_root(), "etc",
-                "sysidcfg")
-
-        cfg_file = None
-
-        defaults = {
-            "root_password"      : "test",
-            "systen_locale"      : "en_US",
-            "timeserver"         : "localhost",
-            "timezone"           : "US/Eastern",
-            "terminal"           : "vt100",
-            "security_policy"    : "NONE",
-            "nfs4_domain"        : "localdomain",
-            "name_service"       : "NONE",
-            #these values require name_service : DNS {\ndomain_name=val\n...}
-            "domain_name"        : None,
-            "name_server"        : None, # A IPs separated by comma
-            "search"             : None, # Hosts separated by comma
-            # oev
-
-            # need to check if this is necessary when there is no networking
-            "network_interface"  : "PRIMARY",
-            "ip_address"         : "127.0.0.1",
-            "netmask"            : "255.255.255.0",
-            "protocol _ipv6"     : "no",
-            "default_route"      : "127.0.0.1",
-
+        contents = render_sysidcfg(config_dict, self.get_name())
+        return write_config(self.get_zone_root(), SYSIDCFG_PATH, contents)
 
-        }
+    def _write_sc_profile(self, config_dict=None):
+        """
+        writes SC profile into a private temporary file
+        this should be called only by self._install_configured()
+        @param config_dict - dict overriding SYSIDCFG_DEFAULTS
 
-        # This is probably the only reason why Zone Admin is not enough
-#        cfg_file = open(sysidcfg_path, "w")
+        returns path of the profile, caller is responsible for removing it
+        """
+        data = _encode(render_sc_profile(config_dict, self.get_name()))
 
-        # Contents shoudld vary according to network settings
-        # let's leave this simple since we don't support networking yet
+        # mkstemp() creates the file readable by the owner only
+        fd, profile_path = tempfile.mkstemp(prefix=".pyzone", suffix=".xml")
+        try:
+            try:
+                _write_fd(fd, data)
+            finally:
+                os.close(fd)
+        except:
+            os.unlink(profile_path)
+            raise
+        return profile_path
 
     def _zonecfg_set(self, attr, value):
         """
@@ -576,6 +1097,63 @@ class Zone(object):
 
 # End of Class
 
+def configure_zones(zones, config_dict=None, zone_configs=None,
+        workers=CONFIGURE_WORKERS):
+    """
+    runs Zone.configure() for many zones in parallel
+    @param zones - list of Zone() instances in installed state, zones of
+                   SC_PROFILE_BRANDS fail as they are configured only
+                   by Zone.install() and Zone.clone()
+    @param config_dict - dict overriding SYSIDCFG_DEFAULTS for all zones
+    @param zone_configs - dict {'zonename' : config_dict} with per zone
+                          overrides of config_dict
+    @param workers - number of zones configured at the same time
+    @raise ZoneConfigureException listing zones which failed, after all
+           zones are processed, its results and errors attributes allow
+           to resume the batch
+
+    returns dict {'zonename' : True/False} as returned by Zone.configure()
+    """
+    check_user_permissions()
+
+    pending = queue.Queue()
+    for zone in zones:
+        pending.put(zone)
+
+    results = {}
+    errors = {}
+
+    def worker():
+        """takes zones from pending until it's empty"""
+        while True:
+            try:
+                zone = pending.get_nowait()
+            except queue.Empty:
+                return
+
+            name = zone.get_name()
+            try:
+                config = dict(config_dict or {})
+                config.update((zone_configs or {}).get(name, {}))
+                results[name] = zone.configure(config)
+            except Exception as err:
+                # anything left uncaught would kill the thread and the
+                # zone would silently disappear from results
+                errors[name] = err
+
+    threads = []
+    for i in range(max(1, min(workers, pending.qsize()))):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        threads.append(thread)
+
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise ZoneConfigureException(results, errors)
+    return results
+
 def get_zone_by_name(zname):
     """
     returns Zone() instance
@@ -0,0 +1,270 @@
+"""
+tests of the post install configuration, no zones are needed
+"""
+import os, shutil, stat, tempfile, unittest
+from xml.dom import minidom
+
+import pyzone
+
+CONFIG = {"root_password" : "$5$salt$hash"}
+
+
+class FakeZone(pyzone.Zone):
+    """
+    Zone() with zonepath and brand set by hand, no zoneadm is called
+    """
+    def __init__(self, name, zonepath, brand="solaris10", error=None):
+        pyzone.Zone.__init__(self, name)
+        self.set_attr(pyzone.ZONE_ENTRY['ZROOT'], zonepath)
+        self.set_attr(pyzone.ZONE_ENTRY['ZBRAND'], brand)
+        self.error = error
+
+    def refresh_all_info(self):
+        pass
+
+    def _zone_in_states(self, state_list):
+        if self.error:
+            raise self.error
+
+
+class RenderTest(unittest.TestCase):
+
+    def test_sysidcfg(self):
+        contents = pyzone.render_sysidcfg(CONFIG, "myzone")
+        self.assertTrue("root_password=$5$salt$hash\n" in contents)
+        self.assertTrue("name_service=NONE\n" in contents)
+        self.assertTrue("{hostname=myzone " in contents)
+
+    def test_sysidcfg_dns(self):
+        config = dict(CONFIG, name_service="DNS", domain_name="example.com",
+                name_server="10.0.0.1, 10.0.0.2")
+        contents = pyzone.render_sysidcfg(config, "myzone")
+        self.assertTrue("name_service=DNS {domain_name=example.com "
+                "name_server=10.0.0.1,10.0.0.2}\n" in contents)
+
+    def test_invalid_options(self):
+        self.assertRaises(pyzone.ZoneException, pyzone.render_sysidcfg,
+                None, "myzone")
+        self.assertRaises(pyzone.ZoneException, pyzone.render_sysidcfg,
+                dict(CONFIG, bogus=1), "myzone")
+        self.assertRaises(pyzone.ZoneException, pyzone.render_sc_profile,
+                dict(CONFIG, timeserver="ntp"), "myzone")
+        self.assertRaises(pyzone.ZoneException, pyzone.render_sc_profile,
+                dict(CONFIG, name_service="NIS"), "myzone")
+        self.assertRaises(pyzone.ZoneException, pyzone.render_sc_profile,
+                dict(CONFIG, netmask="255.255.0.0"), "myzone")
+        self.assertRaises(pyzone.ZoneException, pyzone.render_sc_profile,
+                CONFIG)
+        for value in ("a\nroot_password=x", "a b", "a}", "{a"):
+            self.assertRaises(pyzone.ZoneException, pyzone.render_sysidcfg,
+                    dict(CONFIG, hostname=value), "myzone")
+        self.assertRaises(pyzone.ZoneException, pyzone.render_sysidcfg,
+                dict(CONFIG, name_service="DNS", search="a b,c"), "myzone")
+        for netmask in ("bad", "24", "255.0.255.0", "255.255.256.0",
+                u"255.255.255.\xb2"):
+            self.assertRaises(pyzone.ZoneException, pyzone.render_sc_profile,
+                    dict(CONFIG, ip_address="10.0.0.5", netmask=netmask),
+                    "myzone")
+
+    def test_sc_profile(self):
+        config = dict(CONFIG, hostname=u"z\xf3ne", name_service="DNS",
+                name_server="10.0.0.1, 10.0.0.2", ip_address="10.0.0.5")
+        contents = pyzone.render_sc_profile(config, "myzone")
+        dom = minidom.parseString(contents.encode("utf-8"))
+
+        values = dict([(node.getAttribute("name"),
+            node.getAttribute("value"))
+            for node in dom.getElementsByTagName("propval")])
+        self.assertEqual(values["nodename"], u"z\xf3ne")
+        self.assertEqual(values["password"], CONFIG["root_password"])
+        self.assertEqual(values["static_address"], "10.0.0.5/24")
+        self.assertFalse("default_route" in values)
+        self.assertEqual([node.getAttribute("value")
+            for node in dom.getElementsByTagName("value_node")],
+            ["10.0.0.1", "10.0.0.2"])
+
+    def test_sc_profile_route(self):
+        config = dict(CONFIG, ip_address="10.0.0.5", netmask="255.255.0.0",
+                default_route="10.0.0.1")
+        contents = pyzone.render_sc_profile(config, "myzone")
+        self.assertTrue('value="10.0.0.5/16"' in contents)
+        self.assertTrue('name="default_route" value="10.0.0.1"' in contents)
+
+
+class WriteConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmp_dir, "root")
+        os.mkdir(self.root)
+        self.path = os.path.join(self.root, "etc", "sysidcfg")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write(self):
+        self.assertTrue(pyzone.write_config(self.root, "etc/sysidcfg", "a"))
+        self.assertEqual(open(self.path).read(), "a")
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_unchanged(self):
+        pyzone.write_config(self.root, "etc/sysidcfg", "a")
+        os.chmod(self.path, 0o644)
+        inode = os.stat(self.path).st_ino
+
+        self.assertFalse(pyzone.write_config(self.root, "etc/sysidcfg", "a"))
+        self.assertEqual(os.stat(self.path).st_ino, inode)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_replace(self):
+        pyzone.write_config(self.root, "etc/sysidcfg", "a")
+        self.assertTrue(pyzone.write_config(self.root, "etc/sysidcfg", "b"))
+        self.assertEqual(open(self.path).read(), "b")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)),
+                ["sysidcfg"])
+
+    def test_symlinks(self):
+        outside = os.path.join(self.tmp_dir, "outside")
+        os.mkdir(outside)
+
+        os.symlink(outside, os.path.join(self.root, "etc"))
+        self.assertRaises(pyzone.ZoneException, pyzone.write_config,
+                self.root, "etc/sysidcfg", "a")
+
+        os.unlink(os.path.join(self.root, "etc"))
+        os.mkdir(os.path.join(self.root, "etc"))
+        os.symlink(os.path.join(outside, "sysidcfg"), self.path)
+        self.assertRaises(pyzone.ZoneException, pyzone.write_config,
+                self.root, "etc/sysidcfg", "a")
+        self.assertEqual(os.listdir(outside), [])
+
+    def test_fifo(self):
+        os.mkdir(os.path.join(self.root, "etc"))
+        os.mkfifo(self.path)
+        self.assertRaises(pyzone.ZoneException, pyzone.write_config,
+                self.root, "etc/sysidcfg", "a")
+
+
+class ConfigureZonesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.check_user_permissions = pyzone.check_user_permissions
+        pyzone.check_user_permissions = lambda *args: None
+
+    def tearDown(self):
+        pyzone.check_user_permissions = self.check_user_permissions
+        shutil.rmtree(self.tmp_dir)
+
+    def zone(self, name, **kwargs):
+        zonepath = os.path.join(self.tmp_dir, name)
+        os.makedirs(os.path.join(zonepath, "root"))
+        return FakeZone(name, zonepath, **kwargs)
+
+    def test_configure(self):
+        zones = [self.zone("a"), self.zone("b")]
+        self.assertEqual(pyzone.configure_zones(zones, CONFIG),
+                {"a" : True, "b" : True})
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp_dir, "a",
+            "root", pyzone.SYSIDCFG_PATH)))
+
+        results = pyzone.configure_zones(zones, CONFIG,
+                {"b" : {"timezone" : "UTC"}})
+        self.assertEqual(results, {"a" : False, "b" : True})
+
+    def test_errors(self):
+        zones = [self.zone("a"), self.zone("b", error=KeyError("down")),
+                self.zone("c", error=pyzone.ZoneException("not installed"))]
+        try:
+            pyzone.configure_zones(zones, CONFIG)
+        except pyzone.ZoneConfigureException as err:
+            self.assertTrue("b (" in str(err))
+            self.assertTrue("c (not installed)" in str(err))
+            self.assertFalse("a (" in str(err))
+            self.assertEqual(err.results, {"a" : True})
+            self.assertEqual(sorted(err.errors), ["b", "c"])
+            self.assertTrue(isinstance(err.errors["b"], KeyError))
+        else:
+            self.fail("ZoneException not raised")
+
+    def test_sc_profile_brand(self):
+        zone = self.zone("a", brand="solaris")
+        self.assertRaises(pyzone.ZoneException, zone.configure, CONFIG)
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir, "a", "root")),
+                [])
+
+
+class InstallTest(unittest.TestCase):
+
+    def setUp(self):
+        self.commands = []
+        self.profiles = []
+        self.configured = []
+        self.getoutputs = pyzone.getoutputs
+        self.check_user_permissions = pyzone.check_user_permissions
+        pyzone.getoutputs = self.fake_getoutputs
+        pyzone.check_user_permissions = lambda *args: None
+
+    def tearDown(self):
+        pyzone.getoutputs = self.getoutputs
+        pyzone.check_user_permissions = self.check_user_permissions
+
+    def fake_getoutputs(self, cmd, check_privileges=True):
+        self.commands.append(cmd)
+        if "-c" in cmd:
+            profile_path = cmd[cmd.index("-c") + 1]
+            self.profiles.append(profile_path)
+            self.assertEqual(stat.S_IMODE(os.stat(profile_path).st_mode),
+                    0o600)
+            minidom.parse(profile_path)
+        return ""
+
+    def zone(self, name, brand):
+        zone = FakeZone(name, "/nonexistent", brand=brand)
+        zone.configure = lambda config_dict: self.configured.append(
+                (name, config_dict))
+        return zone
+
+    def test_install(self):
+        zone = self.zone("a", "solaris10")
+        zone.install()
+        self.assertEqual(self.configured, [])
+
+        zone.install(config_dict=CONFIG)
+        self.assertEqual(self.configured, [("a", CONFIG)])
+        self.assertEqual(self.commands[-1][-1], "install")
+
+        zone.install(print_cmd=True, config_dict=CONFIG)
+        self.assertEqual(len(self.configured), 1)
+
+    def test_install_sc_profile(self):
+        zone = self.zone("a", "solaris")
+        zone.install(config_dict=CONFIG)
+        self.assertEqual(self.configured, [])
+        self.assertEqual(self.commands[-1][-3:],
+                ["install", "-c", self.profiles[0]])
+        self.assertFalse(os.path.exists(self.profiles[0]))
+
+        self.assertRaises(pyzone.ZoneException, zone.install,
+                config_dict={})
+        self.assertEqual(len(self.commands), 1)
+
+    def test_clone(self):
+        source = self.zone("src", "solaris10")
+        self.zone("a", "solaris10").clone(source, config_dict=CONFIG)
+        self.assertEqual(self.configured, [("a", CONFIG)])
+        self.assertEqual(self.commands[-1][-2:], ["clone", "src"])
+
+        source = self.zone("src", "solaris")
+        self.zone("b", "solaris").clone(source, config_dict=CONFIG)
+        self.assertEqual(len(self.configured), 1)
+        self.assertEqual(self.commands[-1][-4:],
+                ["clone", "-c", self.profiles[0], "src"])
+        self.assertFalse(os.path.exists(self.profiles[0]))
+
+        self.zone("c", "solaris").clone(source)
+        self.assertEqual(self.commands[-1][-2:], ["clone", "src"])
+
+
+if __name__ == "__main__":
+    unittest.main()